@@ -9,27 +9,99 @@ This script uses the Digital Ocean API to:
 
 Requirements:
     pip install requests pyyaml
+    pip install orjson  # optional, faster JSON encode/decode
 
 Usage:
     export DIGITALOCEAN_TOKEN="dop_v1_..."
     python scripts/deploy-to-digitalocean.py
+
+Optional:
+    DEPLOY_WEBHOOK_URL   Public URL (e.g. a tunnel) forwarding to the local
+                         listener; deployment alerts are delivered there
+                         instead of polling for status
+    DEPLOY_WEBHOOK_PORT  Local listener port (default: 8787)
+    DEPLOY_CACHE_FILE    Where the last deployed spec hash is kept
+                         (default: .deploy-cache.json)
+
+Flags:
+    --force              Update and redeploy even if the app spec is unchanged
 """
 
 import os
 import sys
 import time
+import copy
 import json
+import hashlib
+import argparse
+import threading
 import requests
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional; fall back to stdlib json
+    orjson = None
 
 DIGITALOCEAN_TOKEN = os.getenv('DIGITALOCEAN_TOKEN')
 API_BASE = 'https://api.digitalocean.com/v2'
 
+# Keep-alive connections per host. Concurrent callers (see preflight) must not
+# exceed this, or urllib3 discards the surplus sockets instead of reusing them.
+HTTP_POOL_SIZE = 8
+
+# Deployment polling: poll every 2s while builds most often fail fast, then
+# back off exponentially up to 30s between polls.
+POLL_INTERVAL_SEC = 2.0
+FAST_POLL_WINDOW_SEC = 20.0
+MAX_POLL_INTERVAL_SEC = 30.0
+
+# Deployment alerts: when a webhook URL is configured, wait for DO's
+# DEPLOYMENT_LIVE / DEPLOYMENT_FAILED alert instead of polling. A slow safety
+# poll still runs in case an alert is never delivered. The destination this
+# script adds is tagged with WEBHOOK_CHANNEL and removed again after the run.
+DEPLOY_WEBHOOK_URL = os.getenv('DEPLOY_WEBHOOK_URL')
+DEPLOY_WEBHOOK_PORT = int(os.getenv('DEPLOY_WEBHOOK_PORT', '8787'))
+DEPLOYMENT_ALERT_RULES = ['DEPLOYMENT_LIVE', 'DEPLOYMENT_FAILED']
+WEBHOOK_SAFETY_POLL_SEC = 120.0
+WEBHOOK_CHANNEL = 'admp-deploy-script'
+
+# Deployment status output: rewrite one line in place on a terminal; in CI
+# logs, print on state changes plus a heartbeat once a minute
+_IS_TTY = sys.stdout.isatty()
+STATUS_HEARTBEAT_SEC = 60.0
+
+# App listings are cached briefly and dropped whenever this client writes an app
+APPS_CACHE_TTL_SEC = 30.0
+APPS_PAGE_SIZE = 200
+
+# Spec hash of the last successful deploy; lets a no-op run skip the API entirely
+DEPLOY_CACHE_FILE = os.getenv('DEPLOY_CACHE_FILE', '.deploy-cache.json')
+
+# Shape shared by env vars set through update_env_vars
+_ENV_TEMPLATE = {'scope': 'RUN_TIME', 'type': 'GENERAL'}
+
 if not DIGITALOCEAN_TOKEN:
     print('Error: DIGITALOCEAN_TOKEN environment variable not set')
     print('Get a token from: https://cloud.digitalocean.com/account/api/tokens')
     sys.exit(1)
 
+def _dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys).encode()
+
+
+def _loads(data: bytes) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # API Helper
 class DigitalOceanAPI:
     def __init__(self, token: str):
@@ -39,41 +111,124 @@ class DigitalOceanAPI:
             'Content-Type': 'application/json'
         }
 
-    def request(self, method: str, path: str, data: Optional[Dict] = None) -> Dict:
-        """Make API request"""
-        url = f'{API_BASE}{path}'
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=self.headers,
-            json=data
+        # Reuse TCP/TLS connections across calls (deployment polling issues many)
+        # and retry rate-limited/transient failures. POST is left out of the
+        # retried methods since creating apps/deployments is not idempotent.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET', 'PUT'],
+            raise_on_status=False
         )
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE, max_retries=retry))
+
+        # Last ETag and parsed body per path, for conditional GETs
+        self._etags: Dict[str, str] = {}
+        self._body_cache: Dict[str, Dict] = {}
+
+        self._apps_cache: Optional[Tuple[float, List[Dict]]] = None
+        self._by_name: Dict[str, Dict] = {}
+
+    def request(self, method: str, path: str, data: Optional[Union[Dict, bytes]] = None,
+                conditional: bool = False) -> Dict:
+        """Make API request (data may be a dict or an already-encoded JSON body)
+
+        With conditional=True the previous response's ETag is sent as
+        If-None-Match, and on 304 Not Modified the cached body is returned.
+        Cached bodies are shared between calls and must not be modified.
+        """
+        url = f'{API_BASE}{path}'
+        body = data if data is None or isinstance(data, bytes) else _dumps(data)
+        headers = {'If-None-Match': self._etags[path]} if conditional and path in self._etags else None
+        response = self.session.request(method, url, data=body, headers=headers, timeout=(5, 30))
         response.raise_for_status()
-        return response.json()
+
+        if response.status_code == 304:
+            return self._body_cache[path]
+
+        result = _loads(response.content)
+        etag = response.headers.get('ETag')
+        if conditional and etag:
+            self._etags[path] = etag
+            self._body_cache[path] = result
+        return result
+
+    def _iter_apps(self) -> Iterator[Dict]:
+        """Yield apps page by page, fetching the next page only when needed"""
+        path = f'/apps?per_page={APPS_PAGE_SIZE}'
+        while path:
+            result = self.request('GET', path)
+            yield from result.get('apps', [])
+            next_url = result.get('links', {}).get('pages', {}).get('next')
+            path = next_url.split(API_BASE, 1)[-1] if next_url else None
+
+    def _apps_cache_fresh(self) -> bool:
+        return bool(self._apps_cache) and time.monotonic() - self._apps_cache[0] < APPS_CACHE_TTL_SEC
 
     def list_apps(self) -> List[Dict]:
-        """List all apps"""
-        result = self.request('GET', '/apps')
-        return result.get('apps', [])
+        """List all apps (cached for APPS_CACHE_TTL_SEC)"""
+        if self._apps_cache_fresh():
+            return self._apps_cache[1]
+
+        apps = list(self._iter_apps())
+        self._apps_cache = (time.monotonic(), apps)
+        self._by_name = {app['spec']['name']: app for app in apps}
+        return apps
+
+    def find_app_by_name(self, name: str) -> Optional[Dict]:
+        """Find app by name, stopping at the first page that contains it
+
+        /apps has no name filter, so pages are scanned client-side; no app
+        list is built and nothing is cached.
+        """
+        return next((app for app in self._iter_apps() if app['spec']['name'] == name), None)
 
     def get_app_by_name(self, name: str) -> Optional[Dict]:
-        """Find app by name"""
-        apps = self.list_apps()
-        for app in apps:
-            if app['spec']['name'] == name:
-                return app
-        return None
-
-    def create_app(self, spec: Dict) -> Dict:
-        """Create new app"""
-        print(f'🚀 Creating app: {spec["name"]}...')
-        result = self.request('POST', '/apps', {'spec': spec})
+        """Find app by name, using the app list cache when it is fresh"""
+        if self._apps_cache_fresh():
+            return self._by_name.get(name)
+        return self.find_app_by_name(name)
+
+    def _invalidate_apps_cache(self):
+        self._apps_cache = None
+        self._by_name = {}
+
+    def get_app(self, app_id: str) -> Optional[Dict]:
+        """Get app by ID, or None if it no longer exists"""
+        try:
+            result = self.request('GET', f'/apps/{app_id}')
+        except requests.HTTPError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
         return result['app']
 
-    def update_app(self, app_id: str, spec: Dict) -> Dict:
-        """Update app spec"""
+    def get_account(self) -> Dict:
+        """Get the account the token belongs to"""
+        result = self.request('GET', '/account')
+        return result['account']
+
+    def list_instance_sizes(self) -> List[Dict]:
+        """List App Platform instance sizes"""
+        result = self.request('GET', '/apps/tiers/instance_sizes')
+        return result.get('instance_sizes', [])
+
+    def create_app(self, spec: Optional[Dict] = None) -> Dict:
+        """Create new app (defaults to the ADMP app spec)"""
+        name = (_APP_SPEC if spec is None else spec)['name']
+        print(f'🚀 Creating app: {name}...')
+        result = self.request('POST', '/apps', _spec_body(spec))
+        self._invalidate_apps_cache()
+        return result['app']
+
+    def update_app(self, app_id: str, spec: Optional[Dict] = None) -> Dict:
+        """Update app spec (defaults to the ADMP app spec)"""
         print(f'🔄 Updating app {app_id}...')
-        result = self.request('PUT', f'/apps/{app_id}', {'spec': spec})
+        result = self.request('PUT', f'/apps/{app_id}', _spec_body(spec))
+        self._invalidate_apps_cache()
         return result['app']
 
     def create_deployment(self, app_id: str, force_rebuild: bool = False) -> Dict:
@@ -86,35 +241,104 @@ class DigitalOceanAPI:
 
     def get_deployment(self, app_id: str, deployment_id: str) -> Dict:
         """Get deployment status"""
-        result = self.request('GET', f'/apps/{app_id}/deployments/{deployment_id}')
+        result = self.request('GET', f'/apps/{app_id}/deployments/{deployment_id}', conditional=True)
         return result['deployment']
 
-    def wait_for_deployment(self, app_id: str, deployment_id: str, max_wait_sec: int = 600) -> Dict:
-        """Wait for deployment to complete"""
+    def _set_deployment_webhook(self, app_id: str, url: Optional[str]) -> bool:
+        """Replace this script's destination on the deployment alerts
+
+        Any destination tagged with WEBHOOK_CHANNEL (including ones left by an
+        earlier run) is dropped; url, if given, is added in its place. Other
+        destinations are kept as they are.
+        """
+        alerts = self.request('GET', f'/apps/{app_id}/alerts').get('alerts', [])
+        found = False
+
+        for alert in alerts:
+            if alert['spec']['rule'] not in DEPLOYMENT_ALERT_RULES:
+                continue
+
+            found = True
+            webhooks = alert.get('slack_webhooks', [])
+            kept = [hook for hook in webhooks if hook.get('channel') != WEBHOOK_CHANNEL]
+            if url:
+                kept.append({'url': url, 'channel': WEBHOOK_CHANNEL})
+            if kept == webhooks:
+                continue
+
+            self.request('POST', f'/apps/{app_id}/alerts/{alert["id"]}/destinations', {
+                'emails': alert.get('emails', []),
+                'slack_webhooks': kept
+            })
+
+        return found
+
+    def configure_deployment_webhook(self, app_id: str, url: str) -> bool:
+        """Deliver the app's deployment alerts to a webhook URL"""
+        return self._set_deployment_webhook(app_id, url)
+
+    def remove_deployment_webhook(self, app_id: str):
+        """Remove the destination added by configure_deployment_webhook"""
+        self._set_deployment_webhook(app_id, None)
+
+    def wait_for_deployment(self, app_id: str, deployment_id: str, max_wait_sec: int = 600,
+                            wake_event: Optional[threading.Event] = None) -> Dict:
+        """Wait for deployment to complete
+
+        If wake_event is given, block on it (set by DeploymentWebhookListener)
+        between status checks instead of polling on a backoff schedule.
+        """
         print('⏳ Waiting for deployment to complete...')
-        start_time = time.time()
-
-        while True:
-            deployment = self.get_deployment(app_id, deployment_id)
-            phase = deployment['phase']
-            progress = deployment.get('progress', {})
-
-            steps_complete = progress.get('steps_successful', 0)
-            steps_total = progress.get('steps_total', 0)
-            print(f'   Status: {phase} ({steps_complete}/{steps_total} steps)')
-
-            if phase == 'ACTIVE':
-                print('✅ Deployment successful!')
-                return deployment
-
-            if phase in ['ERROR', 'CANCELED']:
-                raise Exception(f'Deployment failed with phase: {phase}')
-
-            elapsed = time.time() - start_time
-            if elapsed > max_wait_sec:
-                raise Exception(f'Deployment timeout after {max_wait_sec} seconds')
-
-            time.sleep(10)  # Poll every 10 seconds
+        start_time = time.monotonic()
+        interval = POLL_INTERVAL_SEC
+        last_status = None
+        last_print = 0.0
+
+        try:
+            while True:
+                # Clear before checking, so an alert arriving during or after
+                # the check still wakes the next wait
+                if wake_event is not None:
+                    wake_event.clear()
+                deployment = self.get_deployment(app_id, deployment_id)
+                phase = deployment['phase']
+                progress = deployment.get('progress', {})
+
+                steps_complete = progress.get('steps_successful', 0)
+                steps_total = progress.get('steps_total', 0)
+                status = (phase, steps_complete, steps_total)
+                line = f'   Status: {phase} ({steps_complete}/{steps_total} steps)'
+                if _IS_TTY:
+                    sys.stdout.write(f'\r{line}\033[K')
+                    sys.stdout.flush()
+                elif status != last_status or time.monotonic() - last_print >= STATUS_HEARTBEAT_SEC:
+                    print(line)
+                    last_status = status
+                    last_print = time.monotonic()
+
+                if phase == 'ACTIVE':
+                    break
+
+                if phase in ['ERROR', 'CANCELED']:
+                    raise Exception(f'Deployment failed with phase: {phase}')
+
+                elapsed = time.monotonic() - start_time
+                if elapsed > max_wait_sec:
+                    raise Exception(f'Deployment timeout after {max_wait_sec} seconds')
+
+                if wake_event is not None:
+                    wake_event.wait(min(WEBHOOK_SAFETY_POLL_SEC, max_wait_sec - elapsed))
+                    continue
+
+                if elapsed >= FAST_POLL_WINDOW_SEC:
+                    interval = min(interval * 1.5, MAX_POLL_INTERVAL_SEC)
+                time.sleep(min(interval, max_wait_sec - elapsed))
+        finally:
+            if _IS_TTY:
+                sys.stdout.write('\n')
+
+        print('✅ Deployment successful!')
+        return deployment
 
     def update_env_vars(self, app_id: str, new_env_vars: Dict[str, str]) -> Dict:
         """Update environment variables"""
@@ -129,98 +353,272 @@ class DigitalOceanAPI:
             service = spec['services'][0]
             existing_envs = service.get('envs', [])
 
-            # Create map of existing vars
+            # Map existing vars by key, then add/update new vars over them
             env_map = {e['key']: e for e in existing_envs}
-
-            # Add/update new vars
-            for key, value in new_env_vars.items():
-                env_map[key] = {
-                    'key': key,
-                    'value': str(value),
-                    'scope': 'RUN_TIME',
-                    'type': 'GENERAL'
-                }
+            env_map.update({
+                key: {'key': key, 'value': str(value), **_ENV_TEMPLATE}
+                for key, value in new_env_vars.items()
+            })
 
             service['envs'] = list(env_map.values())
 
         return self.update_app(app_id, spec)
 
 
+class DeploymentWebhookListener:
+    """Local HTTP endpoint that sets an event when a deployment alert arrives"""
+
+    def __init__(self, port: int):
+        self.event = threading.Event()
+        self.app_id: Optional[str] = None  # app whose alerts point here
+        event = self.event
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.send_response(200)
+                self.end_headers()
+                event.set()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        print(f'👂 Listening for deployment alerts on port {self.server.server_port}')
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def deployment_wake_event(api: DigitalOceanAPI, app_id: str,
+                          listener: Optional[DeploymentWebhookListener]) -> Optional[threading.Event]:
+    """Route the app's deployment alerts to the listener, if one is running"""
+    if listener and api.configure_deployment_webhook(app_id, DEPLOY_WEBHOOK_URL):
+        listener.app_id = app_id
+        return listener.event
+    return None
+
+
+def warn_if_polling(listener: Optional[DeploymentWebhookListener], wake_event: Optional[threading.Event]):
+    """Say so when a webhook was configured but alerts couldn't be routed"""
+    if listener and wake_event is None:
+        print('⚠️  App has no deployment alerts to route yet; polling for status instead')
+
+
+# Spec sections whose entries carry their own envs
+_SPEC_COMPONENT_KEYS = ('services', 'workers', 'jobs', 'static_sites', 'functions')
+
+
+def _sorted_envs(obj: Dict) -> Dict:
+    if 'envs' not in obj:
+        return obj
+    return {**obj, 'envs': sorted(obj['envs'], key=lambda env: env['key'])}
+
+
+def canonical_spec(spec: Dict) -> bytes:
+    """Encode an app spec stably under key and env var reordering
+
+    DO may return keys and envs in a different order than they were sent,
+    so specs are compared in this form. The input is not modified.
+    """
+    spec = _sorted_envs(spec)
+    for kind in _SPEC_COMPONENT_KEYS:
+        if kind in spec:
+            spec = {**spec, kind: [_sorted_envs(component) for component in spec[kind]]}
+    return _dumps(spec, sort_keys=True)
+
+
+def deployed_spec_matches(app: Dict, local_spec: bytes) -> bool:
+    """Whether the app's active deployment was built from local_spec
+
+    app['spec'] is the desired spec and changes on PUT even if the following
+    deployment fails, so the active deployment's spec is compared instead.
+    """
+    active = app.get('active_deployment')
+    return bool(active) and canonical_spec(active.get('spec', {})) == local_spec
+
+
+def load_deploy_cache() -> Dict:
+    """Read the last deploy record, if any"""
+    try:
+        with open(DEPLOY_CACHE_FILE, 'rb') as f:
+            return _loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_deploy_cache(app_name: str, app_id: str, hash_: str):
+    """Record the spec hash of a successful deploy"""
+    with open(DEPLOY_CACHE_FILE, 'wb') as f:
+        f.write(_dumps({'app_name': app_name, 'app_id': app_id, 'spec_hash': hash_}))
+
+
+def preflight(api: DigitalOceanAPI, spec: Dict) -> Optional[Dict]:
+    """Look up the app while checking the token and instance sizes
+
+    The three GETs are independent, so they run concurrently over the
+    session's connection pool. Returns the existing app, if any.
+    """
+    with ThreadPoolExecutor(max_workers=min(4, HTTP_POOL_SIZE)) as executor:
+        app_future = executor.submit(api.get_app_by_name, spec['name'])
+        account_future = executor.submit(api.get_account)
+        sizes_future = executor.submit(api.list_instance_sizes)
+
+        account = account_future.result()
+        if account.get('status') == 'locked':
+            raise Exception(f'Account is locked: {account.get("status_message", "")}')
+
+        slugs = {size['slug'] for size in sizes_future.result()}
+        for service in spec.get('services', []):
+            # Legacy slugs (e.g. basic-xxs) may be missing from the listing
+            # but still be accepted, so only warn
+            slug = service.get('instance_size_slug')
+            if slug and slug not in slugs:
+                print(f'⚠️  Instance size "{slug}" is not in the current listing')
+
+        return app_future.result()
+
+
+# ADMP app specification, built once at import. get_app_spec() hands out copies.
+_APP_SPEC = {
+    'name': 'admp-server',
+    'region': 'nyc',
+    'services': [
+        {
+            'name': 'web',
+            'github': {
+                'repo': 'dundas/agentdispatch',
+                'branch': 'main',
+                'deploy_on_push': True
+            },
+            'dockerfile_path': 'Dockerfile',
+            'http_port': 8080,
+            'health_check': {
+                'http_path': '/health',
+                'initial_delay_seconds': 5,
+                'period_seconds': 30,
+                'timeout_seconds': 3,
+                'success_threshold': 1,
+                'failure_threshold': 3
+            },
+            'instance_count': 1,
+            'instance_size_slug': 'basic-xxs',
+            'envs': [
+                {'key': 'NODE_ENV', 'value': 'production', 'scope': 'RUN_TIME'},
+                {'key': 'PORT', 'value': '8080', 'scope': 'RUN_TIME'},
+                {'key': 'CORS_ORIGIN', 'value': '*', 'scope': 'RUN_TIME'},
+                {'key': 'HEARTBEAT_INTERVAL_MS', 'value': '60000', 'scope': 'RUN_TIME'},
+                {'key': 'HEARTBEAT_TIMEOUT_MS', 'value': '300000', 'scope': 'RUN_TIME'},
+                {'key': 'MESSAGE_TTL_SEC', 'value': '86400', 'scope': 'RUN_TIME'},
+                {'key': 'MAX_MESSAGE_SIZE_KB', 'value': '256', 'scope': 'RUN_TIME'},
+                {'key': 'MAX_MESSAGES_PER_AGENT', 'value': '1000', 'scope': 'RUN_TIME'}
+            ],
+            'routes': [{'path': '/'}]
+        }
+    ],
+    # Only needed to route deployment alerts to the webhook listener; the
+    # other deploy specs (.do/app.yaml, JS, shell) don't define alerts
+    **({'alerts': [{'rule': rule} for rule in DEPLOYMENT_ALERT_RULES]} if DEPLOY_WEBHOOK_URL else {})
+}
+
+# Request body for the default spec, encoded once for create_app/update_app
+_APP_SPEC_BYTES = _dumps({'spec': _APP_SPEC})
+
+
+def _spec_body(spec: Optional[Dict]) -> Union[Dict, bytes]:
+    return _APP_SPEC_BYTES if spec is None else {'spec': spec}
+
+
 def get_app_spec() -> Dict:
     """Define app specification"""
-    return {
-        'name': 'admp-server',
-        'region': 'nyc',
-        'services': [
-            {
-                'name': 'web',
-                'github': {
-                    'repo': 'dundas/agentdispatch',
-                    'branch': 'main',
-                    'deploy_on_push': True
-                },
-                'dockerfile_path': 'Dockerfile',
-                'http_port': 8080,
-                'health_check': {
-                    'http_path': '/health',
-                    'initial_delay_seconds': 5,
-                    'period_seconds': 30,
-                    'timeout_seconds': 3,
-                    'success_threshold': 1,
-                    'failure_threshold': 3
-                },
-                'instance_count': 1,
-                'instance_size_slug': 'basic-xxs',
-                'envs': [
-                    {'key': 'NODE_ENV', 'value': 'production', 'scope': 'RUN_TIME'},
-                    {'key': 'PORT', 'value': '8080', 'scope': 'RUN_TIME'},
-                    {'key': 'CORS_ORIGIN', 'value': '*', 'scope': 'RUN_TIME'},
-                    {'key': 'HEARTBEAT_INTERVAL_MS', 'value': '60000', 'scope': 'RUN_TIME'},
-                    {'key': 'HEARTBEAT_TIMEOUT_MS', 'value': '300000', 'scope': 'RUN_TIME'},
-                    {'key': 'MESSAGE_TTL_SEC', 'value': '86400', 'scope': 'RUN_TIME'},
-                    {'key': 'MAX_MESSAGE_SIZE_KB', 'value': '256', 'scope': 'RUN_TIME'},
-                    {'key': 'MAX_MESSAGES_PER_AGENT', 'value': '1000', 'scope': 'RUN_TIME'}
-                ],
-                'routes': [{'path': '/'}]
-            }
-        ]
-    }
+    return copy.deepcopy(_APP_SPEC)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Deploy ADMP to Digital Ocean App Platform')
+    parser.add_argument('--force', action='store_true',
+                        help='update and redeploy even if the app spec is unchanged')
+    return parser.parse_args()
 
 
 def main():
     """Main deployment function"""
+    args = parse_args()
+    listener = None
     try:
         api = DigitalOceanAPI(DIGITALOCEAN_TOKEN)
         app_spec = get_app_spec()
         app_name = app_spec['name']
+        local_spec = canonical_spec(app_spec)
+        local_hash = hashlib.blake2b(local_spec).hexdigest()
+
+        # Same spec as the last successful deploy from here: confirm that app
+        # still runs it with one GET instead of listing all apps
+        cache = load_deploy_cache()
+        if not args.force and cache.get('app_name') == app_name and cache.get('spec_hash') == local_hash:
+            cached_app = api.get_app(cache['app_id'])
+            if cached_app and deployed_spec_matches(cached_app, local_spec):
+                print(f'✅ No changes since last deploy of "{app_name}" (ID: {cache["app_id"]})')
+                return
 
         # Check if app exists
-        app = api.get_app_by_name(app_name)
+        app = preflight(api, app_spec)
+
+        if app and not args.force and deployed_spec_matches(app, local_spec):
+            print(f'✅ App "{app_name}" is up to date (ID: {app["id"]}), no changes to deploy')
+            save_deploy_cache(app_name, app['id'], local_hash)
+            return
+
+        # Without a webhook URL (local dev), fall back to polling
+        if DEPLOY_WEBHOOK_URL:
+            listener = DeploymentWebhookListener(DEPLOY_WEBHOOK_PORT)
+            listener.start()
 
         if app:
             print(f'✅ App "{app_name}" already exists (ID: {app["id"]})')
             print(f'   Live URL: {app.get("live_url", "N/A")}')
 
+            # Route alerts before the update queues a deployment; if the
+            # alert rules only arrive with this update, retry afterwards
+            wake_event = deployment_wake_event(api, app['id'], listener)
+
             # Update app
             print('\n🔄 Updating app configuration...')
-            app = api.update_app(app['id'], app_spec)
-
-            # Create new deployment
-            deployment = api.create_deployment(app['id'], force_rebuild=True)
+            app = api.update_app(app['id'])
+            if listener and wake_event is None:
+                wake_event = deployment_wake_event(api, app['id'], listener)
+
+            # A changed spec makes DO queue a deployment itself; otherwise
+            # (unchanged spec with --force) force a rebuild explicitly
+            deployment = app.get('pending_deployment')
+            if not deployment:
+                deployment = api.create_deployment(app['id'], force_rebuild=True)
             print(f'   Deployment ID: {deployment["id"]}')
 
             # Wait for deployment
-            api.wait_for_deployment(app['id'], deployment['id'])
+            warn_if_polling(listener, wake_event)
+            api.wait_for_deployment(app['id'], deployment['id'], wake_event=wake_event)
+            save_deploy_cache(app_name, app['id'], local_hash)
 
         else:
             print(f'🆕 Creating new app "{app_name}"...')
-            app = api.create_app(app_spec)
+            app = api.create_app()
             print(f'   App ID: {app["id"]}')
             print(f'   Live URL: {app.get("live_url", "Building...")}')
 
-            # Wait for initial deployment
-            if app.get('active_deployment'):
-                api.wait_for_deployment(app['id'], app['active_deployment']['id'])
+            # Wait for initial deployment (queued or already building)
+            deployment = app.get('pending_deployment') or app.get('in_progress_deployment')
+            if deployment:
+                print(f'   Deployment ID: {deployment["id"]}')
+                wake_event = deployment_wake_event(api, app['id'], listener)
+                warn_if_polling(listener, wake_event)
+                api.wait_for_deployment(app['id'], deployment['id'], wake_event=wake_event)
+                save_deploy_cache(app_name, app['id'], local_hash)
 
         print('\n🎉 Deployment complete!')
         print(f'   App URL: {app.get("live_url") or app.get("default_ingress")}')
@@ -239,6 +637,14 @@ def main():
     except Exception as e:
         print(f'❌ Deployment failed: {str(e)}')
         sys.exit(1)
+    finally:
+        if listener:
+            if listener.app_id:
+                try:
+                    api.remove_deployment_webhook(listener.app_id)
+                except requests.RequestException as e:
+                    print(f'⚠️  Could not remove deployment webhook: {e}')
+            listener.stop()
 
 
 if __name__ == '__main__':